@@ -4,13 +4,50 @@ import shutil
 import subprocess
 import tempfile
 import logging
+import cProfile
+import fcntl
+import gzip
+import hashlib
+import hmac
+import io
 import json
+import math
+import mimetypes
+import pstats
+import queue
+import random
+import struct
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from functools import partial, wraps
 from pathlib import Path
-from urllib.parse import quote, urlparse
+from urllib.parse import parse_qsl, quote, urlparse
+from xml.etree import ElementTree
 
-import instaloader
 import requests
-from flask import Flask, Response, after_this_request, jsonify, request, send_file, send_from_directory
+from flask import (
+    Flask,
+    Response,
+    after_this_request,
+    g,
+    has_request_context,
+    jsonify,
+    request,
+    send_file,
+    send_from_directory,
+)
+from werkzeug.utils import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 APP_ROOT = Path(__file__).resolve().parent
 PUBLIC_DIR = APP_ROOT / "public"
@@ -23,6 +60,49 @@ USER_AGENT = os.getenv(
 IG_SESSIONID = os.getenv("IG_SESSIONID", "").strip()
 IG_APP_ID = os.getenv("IG_APP_ID", "936619743392459").strip()
 DEBUG_ERRORS = os.getenv("DEBUG_ERRORS", "false").lower() == "true"
+SESSION_CHECK_INTERVAL = max(int(os.getenv("SESSION_CHECK_INTERVAL", "300")), 30)
+SESSION_REFRESH_MIN_AGE = float(os.getenv("SESSION_REFRESH_MIN_AGE", "15"))
+INSTALOADER_ENABLED = os.getenv("INSTALOADER_ENABLED", "true").lower() == "true"
+INSTALOADER_POOL_SIZE = max(int(os.getenv("INSTALOADER_POOL_SIZE", "2")), 1)
+INSTALOADER_CHECKOUT_WAIT = float(os.getenv("INSTALOADER_CHECKOUT_WAIT", "1"))
+INSTALOADER_MAX_THROTTLE_WAIT = float(os.getenv("INSTALOADER_MAX_THROTTLE_WAIT", "2"))
+DOWNLOAD_SEGMENTS = max(int(os.getenv("DOWNLOAD_SEGMENTS", "4")), 1)
+DOWNLOAD_SEGMENT_MIN_BYTES = int(os.getenv("DOWNLOAD_SEGMENT_MIN_BYTES", str(2 * 1024 * 1024)))
+DOWNLOAD_RETRIES = max(int(os.getenv("DOWNLOAD_RETRIES", "3")), 0)
+DOWNLOAD_RETRY_BACKOFF = float(os.getenv("DOWNLOAD_RETRY_BACKOFF", "0.5"))
+THUMBNAIL_CACHE_DIR = Path(os.getenv("THUMBNAIL_CACHE_DIR") or Path(tempfile.gettempdir()) / "reeltomp3-thumbnails")
+THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv("THUMBNAIL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+THUMBNAIL_MAX_AGE = int(os.getenv("THUMBNAIL_MAX_AGE", str(7 * 24 * 3600)))
+THUMBNAIL_WIDTHS = (240, 480, 720)
+THUMBNAIL_DEFAULT_WIDTH = 480
+THUMBNAIL_SOURCE_MAX_BYTES = 10 * 1024 * 1024
+MP3_CODEC = "libmp3lame"
+MP3_BITRATE = "192k"
+MP3_MAX_AGE = int(os.getenv("MP3_MAX_AGE", "86400"))
+REEL_MAX_AGE = int(os.getenv("REEL_MAX_AGE", "60"))
+REEL_STALE_WHILE_REVALIDATE = int(os.getenv("REEL_STALE_WHILE_REVALIDATE", "300"))
+STATIC_MAX_AGE = 365 * 24 * 3600
+STATIC_COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "5"))
+SLOW_LOG_PATH = os.getenv("SLOW_LOG_PATH", "").strip()
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "").strip()
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "25"))
+SCRATCH_ROOT = os.getenv("SCRATCH_ROOT", "").strip()
+SCRATCH_QUOTA_BYTES = int(os.getenv("SCRATCH_QUOTA_BYTES", str(1024 * 1024 * 1024)))
+SCRATCH_RESERVE_BYTES = int(os.getenv("SCRATCH_RESERVE_BYTES", str(128 * 1024 * 1024)))
+SCRATCH_QUEUE_SECONDS = float(os.getenv("SCRATCH_QUEUE_SECONDS", "10"))
+SCRATCH_STALE_SECONDS = float(os.getenv("SCRATCH_STALE_SECONDS", "1800"))
+SCRATCH_SWEEP_INTERVAL = max(float(os.getenv("SCRATCH_SWEEP_INTERVAL", "300")), 10)
+SCRATCH_PREFIX = "reeltomp3_"
+MAX_CLIP_SECONDS = float(os.getenv("MAX_CLIP_SECONDS", "600"))
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "45"))
+ENDPOINT_DEADLINES = {
+    "api_reel": float(os.getenv("REEL_DEADLINE", REQUEST_DEADLINE)),
+    "api_audio": float(os.getenv("AUDIO_DEADLINE", "120")),
+    "api_preview": float(os.getenv("PREVIEW_DEADLINE", "30")),
+    "api_thumbnail": float(os.getenv("THUMBNAIL_DEADLINE", "20")),
+}
 
 HEADERS = {
     "User-Agent": USER_AGENT,
@@ -36,10 +116,93 @@ ALLOWED_MEDIA_HOSTS = ["cdninstagram.com", "fbcdn.net", "instagram.com", "igcdn.
 SHORTCODE_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
 SHORTCODE_PATTERN = re.compile(r"^[A-Za-z0-9_-]{5,}$")
 
-app = Flask(__name__, static_folder=str(PUBLIC_DIR), static_url_path="")
+# Static files are served by serve_static so they can be fingerprinted and precompressed.
+app = Flask(__name__, static_folder=None)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("reeltomp3")
 logger.info("Starting ReeltoMP3 version=%s", APP_VERSION)
+slow_logger = logging.getLogger("reeltomp3.slow")
+if SLOW_LOG_PATH:
+    slow_logger.addHandler(logging.FileHandler(SLOW_LOG_PATH))
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    """Time budget for one API request, shared by every upstream call it makes."""
+
+    MIN_TIMEOUT = 1.0
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() < self.MIN_TIMEOUT
+
+    def check(self, stage: str = ""):
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline of {self.seconds:g}s spent before {stage or 'next stage'}")
+
+    def timeout(self, cap: float, stage: str = "") -> float:
+        self.check(stage)
+        return min(cap, self.remaining())
+
+
+def get_deadline(deadline: Deadline | None) -> Deadline:
+    return deadline if deadline is not None else Deadline(REQUEST_DEADLINE)
+
+
+def request_deadline(endpoint: str) -> Deadline:
+    return Deadline(ENDPOINT_DEADLINES.get(endpoint, REQUEST_DEADLINE))
+
+
+_NO_TRACE = nullcontext()
+
+
+def current_trace() -> dict | None:
+    return g.get("trace") if has_request_context() else None
+
+
+@contextmanager
+def _trace_stage(name: str):
+    trace = current_trace()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if trace is not None:
+            trace["stages"].append({"name": name, "ms": round((time.perf_counter() - started) * 1000, 2)})
+
+
+def trace_stage(name: str):
+    """Time a block as a named stage of the current request trace."""
+    return _trace_stage(name) if TRACING_ENABLED else _NO_TRACE
+
+
+def traced(name: str):
+    """Record calls to the decorated function as a trace stage.
+
+    When tracing is disabled the function is returned unwrapped, so there is no overhead.
+    """
+
+    def decorate(func):
+        if not TRACING_ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _trace_stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
 
 
 def get_requests_session(url: str | None = None) -> requests.Session:
@@ -85,6 +248,61 @@ def check_instagram_session() -> tuple[bool, dict]:
     return False, {"reason": "unexpected_status", "status": status, "contentType": content_type}
 
 
+_session_status_lock = threading.Lock()
+# Held while a live check runs, so concurrent callers share one upstream request.
+_session_check_lock = threading.Lock()
+_session_status = {"ok": False, "info": {"reason": "not_checked"}, "checkedAt": 0.0}
+_session_refresher_started = False
+
+
+def session_status_age() -> float:
+    with _session_status_lock:
+        checked_at = _session_status["checkedAt"]
+    return time.time() - checked_at if checked_at else float("inf")
+
+
+def refresh_session_status(max_age: float = 0.0) -> dict:
+    """Run a live check unless the cached result is younger than max_age."""
+    with _session_check_lock:
+        if session_status_age() >= max_age:
+            ok, info = check_instagram_session()
+            with _session_status_lock:
+                _session_status.update({"ok": ok, "info": info, "checkedAt": time.time()})
+        with _session_status_lock:
+            return dict(_session_status)
+
+
+def _session_refresher_loop():
+    while True:
+        try:
+            refresh_session_status(max_age=SESSION_CHECK_INTERVAL)
+        except Exception:
+            logger.exception("Session status refresh failed")
+        time.sleep(max(SESSION_CHECK_INTERVAL - session_status_age(), 1))
+
+
+def ensure_session_refresher():
+    global _session_refresher_started
+    with _session_status_lock:
+        if _session_refresher_started:
+            return
+        _session_refresher_started = True
+    # Started lazily so each gunicorn worker owns its thread after fork.
+    thread = threading.Thread(target=_session_refresher_loop, name="session-refresher", daemon=True)
+    thread.start()
+
+
+def get_session_status(force: bool = False) -> dict:
+    ensure_session_refresher()
+    if force:
+        return refresh_session_status(max_age=SESSION_REFRESH_MIN_AGE)
+    if session_status_age() == float("inf"):
+        # Nothing checked yet in this worker: answer with a real result instead of not_checked.
+        return refresh_session_status(max_age=SESSION_CHECK_INTERVAL)
+    with _session_status_lock:
+        return dict(_session_status)
+
+
 def sanitize_filename(value: str) -> str:
     cleaned = re.sub(r"[\\/:*?\"<>|]+", "", value or "")
     cleaned = re.sub(r"\s+", " ", cleaned).strip()
@@ -170,7 +388,242 @@ def get_ffmpeg_path() -> str:
         return "ffmpeg"
 
 
-def configure_instaloader_session(loader: instaloader.Instaloader):
+@dataclass(slots=True)
+class MediaVariant:
+    url: str
+    bitrate: int | None = None
+    width: int | None = None
+    height: int | None = None
+    # DASH representations are single-stream segments; only progressive files are exported.
+    progressive: bool = True
+
+
+@dataclass(slots=True)
+class MediaInfo:
+    title: str = "Instagram Reel"
+    audio_name: str = "Original audio"
+    thumbnail_url: str = ""
+    video_variants: list[MediaVariant] = field(default_factory=list)
+    audio_variants: list[MediaVariant] = field(default_factory=list)
+    audio_asset_id: str = ""
+    expires_at: int | None = None
+
+    @property
+    def video_url(self) -> str:
+        # The last listed version is the smallest rendition, which is all an audio export needs.
+        progressive = [variant for variant in self.video_variants if variant.progressive]
+        return progressive[-1].url if progressive else ""
+
+    def to_api(self) -> dict:
+        download_name = sanitize_filename(self.audio_name or self.title)
+        thumbnail_url = self.thumbnail_url or ""
+        if thumbnail_url and is_allowed_media_host(thumbnail_url):
+            thumbnail_url = f"/api/reel/thumbnail?url={quote(thumbnail_url)}&w={THUMBNAIL_DEFAULT_WIDTH}"
+        return {
+            "title": self.title or "Instagram Reel",
+            "audioName": self.audio_name or "Original audio",
+            "thumbnailUrl": thumbnail_url,
+            "previewUrl": f"/api/reel/preview?url={quote(self.video_url)}",
+            "mp3Url": f"/api/reel/audio?url={quote(self.video_url)}&name={quote(download_name)}",
+            "downloadName": f"{download_name}.mp3",
+            "expiresAt": self.expires_at,
+        }
+
+
+# Declarative description of where each field lives across the GraphQL, private API and
+# embedded page payloads. Paths are tried in order and the first non-empty value wins.
+MEDIA_ROOT_PATHS = [("graphql", "shortcode_media"), ("shortcode_media",), ("items", 0), ()]
+MEDIA_SPEC = {
+    "caption": [("edge_media_to_caption", "edges", 0, "node", "text"), ("caption", "text")],
+    "owner": [("owner", "username"), ("user", "username")],
+    "thumbnail": [
+        ("display_url",),
+        ("thumbnail_src",),
+        ("display_resources", -1, "src"),
+        ("image_versions2", "candidates", 0, "url"),
+    ],
+    "video_url": [("video_url",)],
+    "video_versions": [("video_versions",)],
+    "dash_manifest": [("video_dash_manifest",)],
+    "audio_asset_id": [
+        ("clips_metadata", "music_info", "music_asset_info", "audio_asset_id"),
+        ("clips_metadata", "original_sound_info", "audio_asset_id"),
+        ("music_metadata", "music_asset_info", "audio_asset_id"),
+        ("music_metadata", "audio_id"),
+        ("clips_music_attribution_info", "audio_id"),
+        ("audio", "audio_asset_id"),
+    ],
+    "audio_downloads": [
+        ("clips_metadata", "original_sound_info", "progressive_download_url"),
+        ("clips_metadata", "music_info", "music_asset_info", "progressive_download_url"),
+        ("music_metadata", "music_asset_info", "progressive_download_url"),
+        ("audio", "original_sound_info", "progressive_download_url"),
+    ],
+}
+# Audio names come from a single source object so a title is never paired with another
+# source's artist: (source path, title paths, artist paths).
+AUDIO_NAME_SPEC = [
+    (("clips_music_attribution_info",), [("song_title",), ("title",), ("original_audio_title",)], [("artist_name",)]),
+    (("music_attribution_info",), [("song_title",), ("title",), ("original_audio_title",)], [("artist_name",)]),
+    (("music_info",), [("song_title",), ("title",), ("original_audio_title",)], [("artist_name",)]),
+    (("audio",), [("audio_title",), ("song_title",), ("title",), ("original_audio_title",)], [("artist_name",)]),
+    (("audio", "original_sound_info"), [("original_audio_title",)], []),
+    (("music_metadata", "music_asset_info"), [("title",), ("display_title",)], [("display_artist",)]),
+    (("clips_metadata", "music_info", "music_asset_info"), [("title",), ("display_title",)], [("display_artist",)]),
+    (("clips_metadata", "original_sound_info"), [("original_audio_title",)], []),
+]
+
+
+def compile_path(path: tuple):
+    def get(obj):
+        for key in path:
+            try:
+                obj = obj[key]
+            except (KeyError, IndexError, TypeError):
+                return None
+        return obj
+
+    return get
+
+
+def compile_first(paths: list[tuple]):
+    getters = [compile_path(path) for path in paths]
+
+    def first(obj):
+        for getter in getters:
+            value = getter(obj)
+            if value:
+                return value
+        return None
+
+    return first
+
+
+_media_roots = [compile_path(path) for path in MEDIA_ROOT_PATHS]
+_media_fields = {name: compile_first(paths) for name, paths in MEDIA_SPEC.items()}
+_media_all_fields = {name: [compile_path(path) for path in paths] for name, paths in MEDIA_SPEC.items()}
+_audio_name_sources = [
+    (compile_path(source), compile_first(titles), compile_first(artists))
+    for source, titles, artists in AUDIO_NAME_SPEC
+]
+
+
+def parse_dash_variants(manifest: str) -> tuple[list[MediaVariant], list[MediaVariant]]:
+    video, audio = [], []
+    try:
+        root = ElementTree.fromstring(manifest)
+    except ElementTree.ParseError:
+        return video, audio
+    for element in root.iter():
+        if not element.tag.endswith("Representation"):
+            continue
+        base_url = next((child.text for child in element if child.tag.endswith("BaseURL") and child.text), "")
+        if not base_url:
+            continue
+        kind = element.get("mimeType") or element.get("contentType") or ""
+        variant = MediaVariant(
+            url=base_url.strip(),
+            bitrate=int(element.get("bandwidth")) if (element.get("bandwidth") or "").isdigit() else None,
+            width=int(element.get("width")) if (element.get("width") or "").isdigit() else None,
+            height=int(element.get("height")) if (element.get("height") or "").isdigit() else None,
+            progressive=False,
+        )
+        (audio if kind.startswith("audio") else video).append(variant)
+    return video, audio
+
+
+def url_expiry(url: str) -> int | None:
+    # Instagram CDN URLs carry their expiry as a hex unix timestamp in the `oe` parameter.
+    for key, value in parse_qsl(urlparse(url).query):
+        if key == "oe":
+            try:
+                return int(value, 16)
+            except ValueError:
+                return None
+    return None
+
+
+def extract_audio_title(media: dict) -> str:
+    for source, title, artist in _audio_name_sources:
+        music = source(media)
+        if not isinstance(music, dict):
+            continue
+        song = title(music)
+        if song:
+            by = artist(music)
+            return f"{song} - {by}" if by else song
+    return ""
+
+
+@traced("media_extract")
+def extract_media_info(payload: dict) -> MediaInfo:
+    media = {}
+    for root in _media_roots:
+        candidate = root(payload or {})
+        if isinstance(candidate, dict) and candidate:
+            media = candidate
+            break
+
+    caption = _media_fields["caption"](media) or ""
+    owner = _media_fields["owner"](media) or ""
+
+    video_variants = []
+    video_url = _media_fields["video_url"](media)
+    if video_url:
+        video_variants.append(MediaVariant(url=video_url))
+    for version in _media_fields["video_versions"](media) or []:
+        if isinstance(version, dict) and version.get("url"):
+            video_variants.append(
+                MediaVariant(
+                    url=version["url"],
+                    width=version.get("width"),
+                    height=version.get("height"),
+                )
+            )
+    if video_url:
+        # A GraphQL video_url is the canonical rendition; keep it as the preferred pick.
+        video_variants.append(video_variants.pop(0))
+
+    dash_video, audio_variants = [], []
+    manifest = _media_fields["dash_manifest"](media)
+    if isinstance(manifest, str):
+        dash_video, audio_variants = parse_dash_variants(manifest)
+    # video_versions carry no bitrate; borrow it from the DASH representation of the same size.
+    dash_bitrates = {(variant.width, variant.height): variant.bitrate for variant in dash_video}
+    for variant in video_variants:
+        if variant.bitrate is None and variant.width:
+            variant.bitrate = dash_bitrates.get((variant.width, variant.height))
+    video_variants = dash_video + video_variants
+    for getter in _media_all_fields["audio_downloads"]:
+        url = getter(media)
+        if url:
+            audio_variants.append(MediaVariant(url=url))
+
+    info = MediaInfo(
+        title=caption or (f"Reel by @{owner}" if owner else "Instagram Reel"),
+        audio_name=extract_audio_title(media) or "Original audio",
+        thumbnail_url=_media_fields["thumbnail"](media) or "",
+        video_variants=video_variants,
+        audio_variants=audio_variants,
+        audio_asset_id=str(_media_fields["audio_asset_id"](media) or ""),
+    )
+    info.expires_at = url_expiry(info.video_url) if info.video_url else None
+    return info
+
+
+def media_info_from_post(post) -> MediaInfo:
+    metadata = getattr(post, "_full_metadata_dict", None) or {}
+    info = extract_media_info(metadata.get("shortcode_media") or metadata)
+    info.title = post.caption or f"Reel by @{post.owner_username}"
+    info.thumbnail_url = post.url or info.thumbnail_url
+    if post.video_url:
+        info.video_variants = [variant for variant in info.video_variants if variant.url != post.video_url]
+        info.video_variants.append(MediaVariant(url=post.video_url))
+        info.expires_at = url_expiry(post.video_url)
+    return info
+
+
+def configure_instaloader_session(loader):
     context = loader.context
     session = getattr(context, "_session", None) or getattr(context, "session", None)
     if session is None:
@@ -185,73 +638,201 @@ def configure_instaloader_session(loader: instaloader.Instaloader):
     return session
 
 
-def fetch_instagram_post(shortcode: str):
-    loader = instaloader.Instaloader(
-        download_videos=False,
-        download_video_thumbnails=False,
-        download_geotags=False,
-        download_comments=False,
-        save_metadata=False,
-        quiet=True,
-    )
-    configure_instaloader_session(loader)
-    return instaloader.Post.from_shortcode(loader.context, shortcode)
+def get_instaloader():
+    # Imported on first use so workers start fast and never load it when the strategy is off.
+    import instaloader
+
+    module = instaloader.instaloadercontext
+    if not getattr(module.copy_session, "shares_adapter", False):
+        module.copy_session = _copy_session_sharing_adapter(module.copy_session)
+    return instaloader
+
+
+class SharedHTTPAdapter(requests.adapters.HTTPAdapter):
+    """Connection pool owned by one pooled loader and borrowed by its short-lived sessions.
+
+    Instaloader closes each per-query session copy; that must not drop the warm connections.
+    """
+
+    def close(self):
+        pass
+
+    def release(self):
+        super().close()
+
+
+def _copy_session_sharing_adapter(copy_session):
+    # Instaloader runs every GraphQL query on a fresh copy of the context session, which
+    # would otherwise open a new connection (and TLS handshake) per query.
+    @wraps(copy_session)
+    def wrapper(session, request_timeout=None):
+        new = copy_session(session, request_timeout)
+        adapter = getattr(session, "shared_adapter", None)
+        if adapter is not None:
+            new.mount("https://", adapter)
+            new.mount("http://", adapter)
+        return new
+
+    wrapper.shares_adapter = True
+    return wrapper
+
+
+def apply_deadline_timeout(context, deadline: Deadline):
+    """Cap the timeout of the context session and of the copies made from it by the deadline."""
+    timeout = deadline.timeout(20, "instaloader")
+    context.request_timeout = timeout
+    context._session.request = partial(requests.Session.request, context._session, timeout=timeout)
+
+
+class InstaloaderUnavailable(Exception):
+    """The Instaloader strategy cannot run within this request; try the next strategy."""
+
+
+_rate_controller_class = None
+
+
+def make_rate_controller(context):
+    """Instaloader RateController that refuses to sleep past the checked-out request's deadline."""
+    global _rate_controller_class
+    if _rate_controller_class is None:
+        instaloader = get_instaloader()
+
+        class DeadlineRateController(instaloader.RateController):
+            deadline = None
+
+            def wait_before_query(self, query_type: str):
+                super().wait_before_query(query_type)
+                # A checkout spans several queries; each one gets only what is left of the budget.
+                if self.deadline is not None:
+                    apply_deadline_timeout(self._context, self.deadline)
+
+            def sleep(self, secs: float):
+                # Pooled loaders keep their query history, so this wait can grow to minutes.
+                limit = INSTALOADER_MAX_THROTTLE_WAIT
+                if self.deadline is not None:
+                    limit = min(limit, self.deadline.remaining() - Deadline.MIN_TIMEOUT)
+                if secs > limit:
+                    raise InstaloaderUnavailable(f"Instaloader throttled for {secs:.0f}s")
+                super().sleep(secs)
+
+        _rate_controller_class = DeadlineRateController
+    return _rate_controller_class(context)
+
+
+class InstaloaderPool:
+    """Long-lived Instaloader instances, each with its own warm session and rate controller.
+
+    A loader is checked out exclusively for one request, so the non thread-safe context is
+    never shared between threads.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _create(self):
+        instaloader = get_instaloader()
+        loader = instaloader.Instaloader(
+            download_videos=False,
+            download_video_thumbnails=False,
+            download_geotags=False,
+            download_comments=False,
+            save_metadata=False,
+            quiet=True,
+            sleep=False,
+            max_connection_attempts=1,
+            rate_controller=make_rate_controller,
+        )
+        session = configure_instaloader_session(loader)
+        session.shared_adapter = SharedHTTPAdapter()
+        session.mount("https://", session.shared_adapter)
+        session.mount("http://", session.shared_adapter)
+        return loader
+
+    def _acquire(self, deadline: Deadline):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._create()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        # Wait only briefly: the other strategies are a better use of the budget than queueing.
+        try:
+            return self._idle.get(timeout=min(INSTALOADER_CHECKOUT_WAIT, deadline.remaining()))
+        except queue.Empty:
+            raise InstaloaderUnavailable("All Instaloader contexts are busy") from None
+
+    @contextmanager
+    def checkout(self, deadline: Deadline):
+        deadline.check("instaloader")
+        loader = self._acquire(deadline)
+        healthy = False
+        try:
+            context = loader.context
+            apply_deadline_timeout(context, deadline)
+            context._rate_controller.deadline = deadline
+            yield loader
+            healthy = True
+        except (get_instaloader().exceptions.InstaloaderException, InstaloaderUnavailable, DeadlineExceeded):
+            healthy = True
+            raise
+        finally:
+            loader.context._rate_controller.deadline = None
+            if healthy:
+                self._idle.put(loader)
+            else:
+                # Unexpected failures may leave the session in a bad state; let the pool rebuild it.
+                loader.context._session.shared_adapter.release()
+                with self._lock:
+                    self._created -= 1
+
 
+instaloader_pool = InstaloaderPool(INSTALOADER_POOL_SIZE)
 
-def fetch_reel_json(shortcode: str):
+
+@traced("instaloader")
+def fetch_instagram_post(shortcode: str, deadline: Deadline | None = None) -> tuple[bool, MediaInfo | None]:
+    """Return whether the post is a video and, when playable, its MediaInfo.
+
+    Everything is read while the loader is checked out, since Post properties may lazily
+    issue further requests through the loader's context.
+    """
+    deadline = get_deadline(deadline)
+    with instaloader_pool.checkout(deadline) as loader:
+        post = get_instaloader().Post.from_shortcode(loader.context, shortcode)
+        if not post.is_video:
+            return False, None
+        return True, media_info_from_post(post) if post.video_url else None
+
+
+@traced("reel_json")
+def fetch_reel_json(shortcode: str, deadline: Deadline | None = None):
+    deadline = get_deadline(deadline)
     session = get_requests_session("https://www.instagram.com/")
     url = f"https://www.instagram.com/reel/{shortcode}/?__a=1&__d=dis"
-    response = session.get(url, timeout=20)
+    response = session.get(url, timeout=deadline.timeout(20, "reel json"))
     logger.info("Public JSON status=%s content-type=%s", response.status_code, response.headers.get("content-type"))
     if response.ok:
         return response.json()
     return None
 
 
-def parse_reel_json(data: dict):
-    media = (
-        (data or {}).get("graphql", {}).get("shortcode_media")
-        or (data or {}).get("items", [{}])[0]
-        or {}
-    )
-    caption_edges = media.get("edge_media_to_caption", {}).get("edges", [])
-    caption = caption_edges[0]["node"].get("text") if caption_edges else ""
-    owner = media.get("owner", {}).get("username") or ""
-
-    video_url = media.get("video_url") or ""
-    if not video_url and media.get("video_versions"):
-        video_url = media["video_versions"][0].get("url", "")
-
-    thumbnail = (
-        media.get("display_url")
-        or media.get("thumbnail_src")
-        or (media.get("display_resources") or [{}])[-1].get("src", "")
-    )
-
-    music = (
-        media.get("clips_music_attribution_info")
-        or media.get("music_attribution_info")
-        or media.get("music_info")
-        or media.get("audio")
-        or {}
-    )
-    title = (
-        (music.get("song_title") and music.get("artist_name") and f"{music.get('song_title')} - {music.get('artist_name')}")
-        or music.get("song_title")
-        or music.get("title")
-        or music.get("original_audio_title")
-        or ""
-    )
-
-    return {
-        "title": caption or (f"Reel by @{owner}" if owner else "Instagram Reel"),
-        "audioName": title or "Original audio",
-        "thumbnailUrl": thumbnail or "",
-        "videoUrl": video_url or "",
-    }
-
-
-def fetch_private_api(shortcode: str):
+@traced("private_api")
+def fetch_private_api(shortcode: str, deadline: Deadline | None = None):
+    deadline = get_deadline(deadline)
     media_id = shortcode_to_media_id(shortcode)
     session = get_requests_session("https://www.instagram.com/")
     url = f"https://i.instagram.com/api/v1/media/{media_id}/info/"
@@ -259,52 +840,13 @@ def fetch_private_api(shortcode: str):
     headers["Accept"] = "application/json"
     if IG_APP_ID:
         headers["X-IG-App-ID"] = IG_APP_ID
-    response = session.get(url, headers=headers, timeout=20)
+    response = session.get(url, headers=headers, timeout=deadline.timeout(20, "private api"))
     logger.info("Private API status=%s content-type=%s", response.status_code, response.headers.get("content-type"))
     if response.ok:
         return response.json()
     return None
 
 
-def parse_private_api(data: dict):
-    item = (data or {}).get("items", [{}])[0] or {}
-    caption = (item.get("caption") or {}).get("text", "")
-    user = (item.get("user") or {}).get("username", "")
-
-    video_versions = item.get("video_versions") or []
-    video_url = ""
-    if video_versions:
-        video_url = video_versions[-1].get("url") or video_versions[0].get("url", "")
-
-    thumbnail = (
-        (item.get("image_versions2") or {}).get("candidates", [{}])[0].get("url", "")
-    )
-
-    audio_title = ""
-    audio = item.get("audio") or {}
-    music_meta = item.get("music_metadata") or {}
-    if audio:
-        audio_title = audio.get("audio_title") or audio.get("original_sound_info", {}).get("original_audio_title", "")
-        artist = audio.get("artist_name")
-        if audio_title and artist:
-            audio_title = f"{audio_title} - {artist}"
-    if not audio_title and music_meta:
-        asset = music_meta.get("music_asset_info") or {}
-        title = asset.get("title") or asset.get("display_title")
-        artist = asset.get("display_artist")
-        if title and artist:
-            audio_title = f"{title} - {artist}"
-        else:
-            audio_title = title or ""
-
-    return {
-        "title": caption or (f"Reel by @{user}" if user else "Instagram Reel"),
-        "audioName": audio_title or "Original audio",
-        "thumbnailUrl": thumbnail or "",
-        "videoUrl": video_url or "",
-    }
-
-
 def find_media_item_in_json(obj):
     if isinstance(obj, dict):
         if obj.get("video_url") or obj.get("video_versions"):
@@ -341,49 +883,6 @@ def find_media_item_in_json(obj):
     return None
 
 
-def extract_audio_title_from_item(item: dict) -> str:
-    audio_title = ""
-    audio = item.get("audio") or {}
-    music_meta = item.get("music_metadata") or {}
-    if audio:
-        audio_title = audio.get("audio_title") or audio.get("original_sound_info", {}).get(
-            "original_audio_title", ""
-        )
-        artist = audio.get("artist_name")
-        if audio_title and artist:
-            audio_title = f"{audio_title} - {artist}"
-    if not audio_title and music_meta:
-        asset = music_meta.get("music_asset_info") or {}
-        title = asset.get("title") or asset.get("display_title")
-        artist = asset.get("display_artist")
-        if title and artist:
-            audio_title = f"{title} - {artist}"
-        else:
-            audio_title = title or ""
-    return audio_title or "Original audio"
-
-
-def parse_media_item(item: dict):
-    caption = (item.get("caption") or {}).get("text", "")
-    user = (item.get("user") or {}).get("username", "")
-    video_versions = item.get("video_versions") or []
-    video_url = item.get("video_url") or ""
-    if not video_url and video_versions:
-        video_url = video_versions[-1].get("url") or video_versions[0].get("url", "")
-
-    thumbnail = (
-        (item.get("image_versions2") or {}).get("candidates", [{}])[0].get("url", "")
-    )
-
-    audio_title = extract_audio_title_from_item(item)
-    return {
-        "title": caption or (f"Reel by @{user}" if user else "Instagram Reel"),
-        "audioName": audio_title or "Original audio",
-        "thumbnailUrl": thumbnail or "",
-        "videoUrl": video_url or "",
-    }
-
-
 def find_shortcode_in_json(obj) -> str:
     if isinstance(obj, dict):
         for key, value in obj.items():
@@ -449,6 +948,7 @@ def extract_reel_shortcode_from_html(html: str):
     return ""
 
 
+@traced("html_extract")
 def extract_json_objects_from_html(html: str):
     objects = []
     next_data_match = re.search(
@@ -510,20 +1010,22 @@ def extract_json_objects_from_html(html: str):
     return objects
 
 
-def extract_media_from_html(html: str):
+def extract_media_from_html(html: str) -> MediaInfo | None:
     for obj in extract_json_objects_from_html(html):
         candidate = find_media_item_in_json(obj)
         if candidate:
-            parsed = parse_media_item(candidate)
-            if parsed.get("videoUrl"):
-                return parsed
-    return {}
+            info = extract_media_info(candidate)
+            if info.video_url:
+                return info
+    return None
 
 
-def fetch_audio_json(audio_id: str):
+@traced("audio_json")
+def fetch_audio_json(audio_id: str, deadline: Deadline | None = None):
+    deadline = get_deadline(deadline)
     session = get_requests_session("https://www.instagram.com/")
     url = f"https://www.instagram.com/reels/audio/{audio_id}/?__a=1&__d=dis"
-    response = session.get(url, timeout=20)
+    response = session.get(url, timeout=deadline.timeout(20, "audio json"))
     logger.info("Audio JSON status=%s content-type=%s", response.status_code, response.headers.get("content-type"))
     if response.ok:
         try:
@@ -533,7 +1035,9 @@ def fetch_audio_json(audio_id: str):
     return None
 
 
-def fetch_audio_private_api(audio_id: str):
+@traced("audio_private_api")
+def fetch_audio_private_api(audio_id: str, deadline: Deadline | None = None):
+    deadline = get_deadline(deadline)
     session = get_requests_session("https://www.instagram.com/")
     headers = dict(session.headers)
     headers["Accept"] = "application/json"
@@ -547,7 +1051,7 @@ def fetch_audio_private_api(audio_id: str):
         f"https://i.instagram.com/api/v1/music/audio/{audio_id}/sections/?tab=clips",
     ]
     for url in endpoints:
-        response = session.get(url, headers=headers, timeout=20)
+        response = session.get(url, headers=headers, timeout=deadline.timeout(20, "audio private api"))
         logger.info(
             "Audio private status=%s content-type=%s url=%s",
             response.status_code,
@@ -562,21 +1066,22 @@ def fetch_audio_private_api(audio_id: str):
     return None
 
 
-def extract_shortcode_from_audio_page(audio_url: str) -> str:
+def extract_shortcode_from_audio_page(audio_url: str, deadline: Deadline | None = None) -> str:
+    deadline = get_deadline(deadline)
     audio_id = extract_audio_id(audio_url)
     if audio_id:
-        data = fetch_audio_json(audio_id)
+        data = fetch_audio_json(audio_id, deadline)
         shortcode = find_shortcode_in_json(data or {})
         if shortcode:
             return shortcode
 
-        private_data = fetch_audio_private_api(audio_id)
+        private_data = fetch_audio_private_api(audio_id, deadline)
         shortcode = find_shortcode_in_json(private_data or {})
         if shortcode:
             return shortcode
 
     session = get_requests_session("https://www.instagram.com/")
-    response = session.get(audio_url, timeout=20)
+    response = session.get(audio_url, timeout=deadline.timeout(20, "audio page"))
     logger.info("Audio page status=%s content-type=%s", response.status_code, response.headers.get("content-type"))
     if not response.ok:
         return ""
@@ -588,7 +1093,7 @@ def extract_shortcode_from_audio_page(audio_url: str) -> str:
     audio_id = extract_audio_id(audio_url)
     if audio_id:
         embed_url = f"https://www.instagram.com/reels/audio/{audio_id}/embed/"
-        embed_response = session.get(embed_url, timeout=20)
+        embed_response = session.get(embed_url, timeout=deadline.timeout(20, "audio embed"))
         logger.info(
             "Audio embed status=%s content-type=%s",
             embed_response.status_code,
@@ -602,38 +1107,41 @@ def extract_shortcode_from_audio_page(audio_url: str) -> str:
     return ""
 
 
-def resolve_audio_link(audio_url: str):
+@traced("resolve_audio_link")
+def resolve_audio_link(audio_url: str, deadline: Deadline | None = None) -> tuple[MediaInfo | None, str]:
+    """Resolve an audio page to either a playable media record or a reel shortcode."""
+    deadline = get_deadline(deadline)
     audio_id = extract_audio_id(audio_url)
     if audio_id:
-        data = fetch_audio_json(audio_id)
+        data = fetch_audio_json(audio_id, deadline)
         candidate = find_media_item_in_json(data or {})
         if candidate:
-            parsed = parse_media_item(candidate)
-            if parsed.get("videoUrl"):
-                return parsed
+            info = extract_media_info(candidate)
+            if info.video_url:
+                return info, ""
 
-        private_data = fetch_audio_private_api(audio_id)
+        private_data = fetch_audio_private_api(audio_id, deadline)
         candidate = find_media_item_in_json(private_data or {})
         if candidate:
-            parsed = parse_media_item(candidate)
-            if parsed.get("videoUrl"):
-                return parsed
+            info = extract_media_info(candidate)
+            if info.video_url:
+                return info, ""
 
     session = get_requests_session("https://www.instagram.com/")
-    response = session.get(audio_url, timeout=20)
+    response = session.get(audio_url, timeout=deadline.timeout(20, "audio page"))
     logger.info("Audio page status=%s content-type=%s", response.status_code, response.headers.get("content-type"))
     if response.ok:
         html = response.text
         media = extract_media_from_html(html)
-        if media.get("videoUrl"):
-            return media
+        if media:
+            return media, ""
         shortcode = extract_reel_shortcode_from_html(html)
         if shortcode:
-            return {"shortcode": shortcode}
+            return None, shortcode
 
         if audio_id:
             embed_url = f"https://www.instagram.com/reels/audio/{audio_id}/embed/"
-            embed_response = session.get(embed_url, timeout=20)
+            embed_response = session.get(embed_url, timeout=deadline.timeout(20, "audio embed"))
             logger.info(
                 "Audio embed status=%s content-type=%s",
                 embed_response.status_code,
@@ -641,78 +1149,741 @@ def resolve_audio_link(audio_url: str):
             )
             if embed_response.ok:
                 embed_media = extract_media_from_html(embed_response.text)
-                if embed_media.get("videoUrl"):
-                    return embed_media
+                if embed_media:
+                    return embed_media, ""
                 shortcode = extract_reel_shortcode_from_html(embed_response.text)
                 if shortcode:
-                    return {"shortcode": shortcode}
+                    return None, shortcode
 
-    return {}
+    return None, ""
 
 
-def extract_audio_name(post) -> str:
-    try:
-        metadata = getattr(post, "_full_metadata_dict", None)
-        if not metadata:
-            return ""
-        media = metadata.get("shortcode_media", {})
-        music = (
-            media.get("clips_music_attribution_info")
-            or media.get("music_attribution_info")
-            or media.get("music_info")
-            or media.get("audio")
-            or {}
+def probe_download(url: str, deadline: Deadline) -> tuple[int, bool]:
+    session = get_requests_session(url)
+    headers = {"Range": "bytes=0-0"}
+    with session.get(url, headers=headers, stream=True, timeout=deadline.timeout(15, "download probe")) as response:
+        response.raise_for_status()
+        content_range = response.headers.get("content-range", "")
+        if response.status_code == 206 and "/" in content_range:
+            total = content_range.rsplit("/", 1)[-1]
+            if total.isdigit():
+                return int(total), True
+        length = response.headers.get("content-length", "")
+        return (int(length) if length.isdigit() else 0), False
+
+
+class DownloadCancelled(Exception):
+    pass
+
+
+def download_segment(
+    url: str,
+    dest_path: Path,
+    start: int,
+    end: int,
+    deadline: Deadline,
+    cancel: threading.Event | None = None,
+    progress: dict | None = None,
+):
+    """Fetch bytes start..end into dest_path, resuming after failures.
+
+    progress[start] is kept at the first byte not yet written, so a caller can tell what is
+    still missing after the segment fails or is cancelled.
+    """
+    cancel = cancel or threading.Event()
+    progress = progress if progress is not None else {}
+    session = get_requests_session(url)
+    position = start
+    progress[start] = position
+    attempt = 0
+    while position <= end:
+        if cancel.is_set():
+            raise DownloadCancelled(f"Segment {start}-{end} cancelled")
+        resumed_at = position
+        try:
+            headers = {"Range": f"bytes={position}-{end}"}
+            with session.get(url, headers=headers, stream=True, timeout=deadline.timeout(30, "download")) as response:
+                if response.status_code != 206:
+                    raise RuntimeError(f"Range request returned status {response.status_code}")
+                with open(dest_path, "r+b") as handle:
+                    handle.seek(position)
+                    for chunk in response.iter_content(chunk_size=1024 * 64):
+                        if chunk:
+                            chunk = chunk[: end - position + 1]
+                            handle.write(chunk)
+                            position += len(chunk)
+                            progress[start] = position
+                        deadline.check("download")
+                        if cancel.is_set():
+                            raise DownloadCancelled(f"Segment {start}-{end} cancelled")
+            if position <= end:
+                raise RuntimeError(f"Segment {start}-{end} ended early at byte {position}")
+        except (requests.RequestException, RuntimeError) as exc:
+            # Retries are for consecutive failures; a connection that made progress starts over.
+            if position > resumed_at:
+                attempt = 0
+            attempt += 1
+            if attempt > DOWNLOAD_RETRIES:
+                raise
+            logger.warning(
+                "Segment %s-%s failed at byte %s (attempt %s): %s", start, end, position, attempt, exc
+            )
+            backoff = DOWNLOAD_RETRY_BACKOFF * 2 ** (attempt - 1)
+            # Event.wait returns early when another segment has already failed for good.
+            cancel.wait(min(backoff, max(deadline.remaining() - Deadline.MIN_TIMEOUT, 0)))
+
+
+def download_file_segmented(url: str, dest_path: Path, size: int, deadline: Deadline) -> int:
+    segment_size = -(-size // DOWNLOAD_SEGMENTS)
+    with open(dest_path, "wb") as handle:
+        handle.truncate(size)
+
+    ranges = [(start, min(start + segment_size, size) - 1) for start in range(0, size, segment_size)]
+    progress = {start: start for start, _ in ranges}
+    cancel = threading.Event()
+    failure = None
+    with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="download") as pool:
+        futures = [
+            pool.submit(download_segment, url, dest_path, start, end, deadline, cancel, progress)
+            for start, end in ranges
+        ]
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except Exception as exc:
+            # Stop the remaining segments now instead of letting them finish their own retries.
+            cancel.set()
+            if isinstance(exc, DeadlineExceeded):
+                raise
+            failure = exc
+        except BaseException:
+            cancel.set()
+            raise
+
+    if failure is not None:
+        # Every segment thread has stopped, so progress shows exactly which bytes are on disk.
+        missing = [(progress[start], end) for start, end in ranges if progress[start] <= end]
+        logger.warning(
+            "Segmented download failed, fetching %s missing bytes over one connection: %s",
+            sum(end - start + 1 for start, end in missing),
+            failure,
         )
-        title = music.get("song_title") or music.get("title") or music.get("original_audio_title")
-        artist = music.get("artist_name")
-        if title and artist:
-            return f"{title} - {artist}"
-        return title or ""
-    except Exception:
-        return ""
+        for start, end in missing:
+            download_segment(url, dest_path, start, end, deadline)
+    return len(ranges)
 
 
-def download_file(url: str, dest_path: Path):
+def download_file_stream(url: str, dest_path: Path, deadline: Deadline) -> int:
     session = get_requests_session(url)
-    with session.get(url, stream=True, timeout=30) as response:
+    written = 0
+    with session.get(url, stream=True, timeout=deadline.timeout(30, "download")) as response:
         response.raise_for_status()
         with open(dest_path, "wb") as handle:
             for chunk in response.iter_content(chunk_size=1024 * 64):
                 if chunk:
                     handle.write(chunk)
+                    written += len(chunk)
+                deadline.check("download")
+    return written
+
+
+@traced("download_file")
+def download_file(url: str, dest_path: Path, deadline: Deadline | None = None) -> dict:
+    deadline = get_deadline(deadline)
+    started = time.monotonic()
+    size, ranged = 0, False
+    try:
+        size, ranged = probe_download(url, deadline)
+    except requests.RequestException as exc:
+        logger.info("Download probe failed, using single stream: %s", exc)
+
+    segments = 1
+    if ranged and DOWNLOAD_SEGMENTS > 1 and size >= DOWNLOAD_SEGMENT_MIN_BYTES:
+        try:
+            segments = download_file_segmented(url, dest_path, size, deadline)
+        except DeadlineExceeded:
+            raise
+        except Exception as exc:
+            logger.warning("Ranged download failed, retrying as single stream: %s", exc)
+            segments = 1
+            size = download_file_stream(url, dest_path, deadline)
+    else:
+        size = download_file_stream(url, dest_path, deadline)
+
+    elapsed = max(time.monotonic() - started, 1e-6)
+    stats = {
+        "bytes": size,
+        "seconds": round(elapsed, 3),
+        "segments": segments,
+        "mbps": round(size * 8 / elapsed / 1_000_000, 2),
+    }
+    logger.info(
+        "Downloaded bytes=%s seconds=%.2f segments=%s throughput=%.2fMbps",
+        stats["bytes"],
+        stats["seconds"],
+        stats["segments"],
+        stats["mbps"],
+    )
+    return stats
+
+
+MP4_CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+MP4_HEADER_PROBE_BYTES = 64 * 1024
+# Extra audio fetched around a clip so ffmpeg's seek and priming samples land on real data.
+CLIP_MARGIN_SECONDS = 1.0
+
+
+def iter_mp4_boxes(data: bytes, start: int = 0, end: int | None = None):
+    end = len(data) if end is None else end
+    position = start
+    while position + 8 <= end:
+        size, box_type = struct.unpack(">I4s", data[position : position + 8])
+        header = 8
+        if size == 1:
+            if position + 16 > end:
+                return
+            size = struct.unpack(">Q", data[position + 8 : position + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - position
+        if size < header:
+            return
+        yield box_type, position, position + header, position + size
+        position += size
+
+
+def find_mp4_box(data: bytes, path: list[bytes], start: int = 0, end: int | None = None):
+    for box_type, _, body, box_end in iter_mp4_boxes(data, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return body, box_end
+            found = find_mp4_box(data, path[1:], body, box_end)
+            if found:
+                return found
+    return None
 
 
-def run_ffmpeg(input_path: Path, output_path: Path):
+def parse_mp4_audio_track(moov: bytes) -> dict | None:
+    for box_type, _, body, box_end in iter_mp4_boxes(moov):
+        if box_type != b"trak":
+            continue
+        hdlr = find_mp4_box(moov, [b"mdia", b"hdlr"], body, box_end)
+        if not hdlr or moov[hdlr[0] + 8 : hdlr[0] + 12] != b"soun":
+            continue
+        mdhd = find_mp4_box(moov, [b"mdia", b"mdhd"], body, box_end)
+        stbl = find_mp4_box(moov, [b"mdia", b"minf", b"stbl"], body, box_end)
+        if not mdhd or not stbl:
+            return None
+        version = moov[mdhd[0]]
+        timescale_at = mdhd[0] + (20 if version == 1 else 12)
+        timescale = struct.unpack(">I", moov[timescale_at : timescale_at + 4])[0]
+
+        tables = {}
+        for table_type, _, table_body, _ in iter_mp4_boxes(moov, *stbl):
+            tables[table_type] = table_body
+        if not timescale or not {b"stts", b"stsc", b"stsz"} <= tables.keys():
+            return None
+
+        def entries(box: bytes, fields: int, offset: int = 4):
+            count = struct.unpack(">I", moov[tables[box] + offset : tables[box] + offset + 4])[0]
+            start = tables[box] + offset + 4
+            return struct.iter_unpack(">" + "I" * fields, moov[start : start + count * 4 * fields])
+
+        sample_times = []
+        elapsed = 0
+        for count, delta in entries(b"stts", 2):
+            for _ in range(count):
+                sample_times.append(elapsed / timescale)
+                elapsed += delta
+
+        stsz = tables[b"stsz"]
+        uniform_size, sample_count = struct.unpack(">II", moov[stsz + 4 : stsz + 12])
+        if uniform_size:
+            sample_sizes = [uniform_size] * sample_count
+        else:
+            sample_sizes = [size for (size,) in entries(b"stsz", 1, 8)]
+
+        if b"co64" in tables:
+            co64 = tables[b"co64"]
+            chunk_count = struct.unpack(">I", moov[co64 + 4 : co64 + 8])[0]
+            chunk_offsets = [
+                offset for (offset,) in struct.iter_unpack(">Q", moov[co64 + 8 : co64 + 8 + chunk_count * 8])
+            ]
+        elif b"stco" in tables:
+            chunk_offsets = [offset for (offset,) in entries(b"stco", 1)]
+        else:
+            return None
+
+        sample_offsets = []
+        stsc = list(entries(b"stsc", 3))
+        for index, (first_chunk, samples_per_chunk, _) in enumerate(stsc):
+            last_chunk = stsc[index + 1][0] - 1 if index + 1 < len(stsc) else len(chunk_offsets)
+            for chunk in range(first_chunk - 1, last_chunk):
+                offset = chunk_offsets[chunk]
+                for _ in range(samples_per_chunk):
+                    if len(sample_offsets) >= len(sample_sizes):
+                        break
+                    sample_offsets.append(offset)
+                    offset += sample_sizes[len(sample_offsets) - 1]
+
+        samples = min(len(sample_times), len(sample_offsets))
+        return {
+            "times": sample_times[:samples],
+            "offsets": sample_offsets[:samples],
+            "sizes": sample_sizes[:samples],
+        }
+    return None
+
+
+def fetch_range(url: str, start: int, end: int, deadline: Deadline) -> bytes:
+    session = get_requests_session(url)
+    headers = {"Range": f"bytes={start}-{end}"}
+    response = session.get(url, headers=headers, timeout=deadline.timeout(15, "range fetch"))
+    if response.status_code != 206:
+        raise RuntimeError(f"Range request returned status {response.status_code}")
+    return response.content
+
+
+@traced("download_mp4_window")
+def download_mp4_window(url: str, dest_path: Path, start: float, end: float, deadline: Deadline | None = None) -> bool:
+    """Fetch only the moov header and the audio bytes for [start, end] of a fast-start MP4.
+
+    The file is written sparse at its original size so ffmpeg can seek into it normally.
+    Returns False when the source is not suitable and the caller should download it whole.
+    """
+    deadline = get_deadline(deadline)
+    size, ranged = probe_download(url, deadline)
+    if not ranged or not size:
+        return False
+
+    head = fetch_range(url, 0, min(MP4_HEADER_PROBE_BYTES, size) - 1, deadline)
+    moov = None
+    for box_type, _, box_body, box_end in iter_mp4_boxes(head):
+        if box_type == b"mdat":
+            return False
+        if box_type == b"moov":
+            moov = (box_body, box_end)
+            break
+    if not moov:
+        return False
+    header_end = min(moov[1] + 16, size)
+    if header_end > len(head):
+        head = fetch_range(url, 0, header_end - 1, deadline)
+
+    track = parse_mp4_audio_track(head[moov[0] : moov[1]])
+    if not track or not track["times"]:
+        return False
+
+    times = track["times"]
+    first = next((i for i, t in enumerate(times) if t >= start - CLIP_MARGIN_SECONDS), len(times) - 1)
+    last = next((i for i, t in enumerate(times) if t > end + CLIP_MARGIN_SECONDS), len(times)) - 1
+    last = max(last, first)
+    range_start = max(track["offsets"][first], header_end)
+    range_end = track["offsets"][last] + track["sizes"][last] - 1
+    if range_end - range_start > size * 0.8:
+        return False
+
+    with open(dest_path, "wb") as handle:
+        handle.truncate(size)
+        handle.write(head[:header_end])
+    if range_end >= range_start:
+        download_segment(url, dest_path, range_start, min(range_end, size - 1), deadline)
+    logger.info(
+        "Fetched clip window %.1f-%.1fs bytes=%s of %s",
+        start,
+        end,
+        header_end + max(range_end - range_start + 1, 0),
+        size,
+    )
+    return True
+
+
+@traced("run_ffmpeg")
+def run_ffmpeg(
+    input_path: Path,
+    output_path: Path,
+    deadline: Deadline | None = None,
+    start: float | None = None,
+    duration: float | None = None,
+):
+    deadline = get_deadline(deadline)
     ffmpeg_path = get_ffmpeg_path()
+    command = [ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y"]
+    if start:
+        command += ["-ss", f"{start:.3f}"]
+    command += ["-i", str(input_path)]
+    if duration:
+        command += ["-t", f"{duration:.3f}"]
+    command += [
+        "-vn",
+        "-acodec",
+        MP3_CODEC,
+        "-b:a",
+        MP3_BITRATE,
+        str(output_path),
+    ]
+    deadline.check("ffmpeg")
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=deadline.remaining())
+    except subprocess.TimeoutExpired as exc:
+        raise DeadlineExceeded("ffmpeg did not finish within the request deadline") from exc
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr or "ffmpeg failed")
+
+
+class ScratchQuotaExceeded(Exception):
+    pass
+
+
+def choose_scratch_root() -> tuple[Path, bool]:
+    if SCRATCH_ROOT:
+        return Path(SCRATCH_ROOT), False
+    shm = Path("/dev/shm")
+    # Decided from total capacity, not current free space, so every worker (including one
+    # restarted while conversions fill tmpfs) picks the same root and shares one quota.
+    try:
+        if shm.is_dir() and os.access(shm, os.W_OK) and shutil.disk_usage(shm).total >= SCRATCH_QUOTA_BYTES:
+            return shm, True
+    except OSError:
+        pass
+    return Path(tempfile.gettempdir()), False
+
+
+class ScratchSpace:
+    """Per-request working directories under one root with a byte quota shared by all workers.
+
+    Usage is read from disk under an flock, so every gunicorn worker sees the same total.
+    Each directory counts as the larger of its allocated blocks and its reservation.
+    """
+
+    RESERVATION_FILE = ".reservation"
+
+    def __init__(self, quota: int):
+        self.root, self.tmpfs = choose_scratch_root()
+        self.quota = quota
+        self.rejected = 0
+        self.swept = 0
+        self.last_sweep_at = None
+        self._janitor_started = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _flock(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / f".{SCRATCH_PREFIX}lock", "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _directories(self, root: Path | None = None):
+        try:
+            entries = list(os.scandir(root or self.root))
+        except OSError:
+            return []
+        return [entry for entry in entries if entry.name.startswith(SCRATCH_PREFIX) and entry.is_dir()]
+
+    def _directory_usage(self, path: str) -> tuple[int, int]:
+        used = 0
+        reserved = 0
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                file_path = os.path.join(dirpath, filename)
+                try:
+                    if filename == self.RESERVATION_FILE:
+                        reserved = int(Path(file_path).read_text() or 0)
+                    else:
+                        # Blocks rather than st_size, so sparse clip downloads count what they use.
+                        used += os.stat(file_path).st_blocks * 512
+                except (OSError, ValueError):
+                    continue
+        return used, reserved
+
+    def usage(self) -> dict:
+        used = 0
+        reserved = 0
+        charged = 0
+        directories = self._directories()
+        for entry in directories:
+            dir_used, dir_reserved = self._directory_usage(entry.path)
+            used += dir_used
+            reserved += dir_reserved
+            charged += max(dir_used, dir_reserved)
+        return {
+            "root": str(self.root),
+            "tmpfs": self.tmpfs,
+            "quotaBytes": self.quota,
+            "usedBytes": used,
+            "reservedBytes": reserved,
+            "chargedBytes": charged,
+            "activeDirs": len(directories),
+            "rejected": self.rejected,
+            "swept": self.swept,
+            "lastSweepAt": int(self.last_sweep_at) if self.last_sweep_at else None,
+        }
+
+    def allocate(self, reserve: int, deadline: Deadline) -> Path:
+        """Create a scratch directory, waiting briefly for quota before rejecting the work."""
+        self.ensure_janitor()
+        waits_until = time.monotonic() + min(SCRATCH_QUEUE_SECONDS, max(deadline.remaining(), 0))
+        while True:
+            with self._flock():
+                if self.usage()["chargedBytes"] + reserve <= self.quota:
+                    path = Path(tempfile.mkdtemp(prefix=SCRATCH_PREFIX, dir=self.root))
+                    (path / self.RESERVATION_FILE).write_text(str(reserve))
+                    return path
+            if time.monotonic() >= waits_until:
+                with self._lock:
+                    self.rejected += 1
+                raise ScratchQuotaExceeded(f"Scratch quota of {self.quota} bytes is full")
+            time.sleep(0.25)
+
+    def release(self, path: Path):
+        shutil.rmtree(path, ignore_errors=True)
+
+    def sweep(self) -> int:
+        removed = 0
+        cutoff = time.time() - SCRATCH_STALE_SECONDS
+        # The system temp dir is swept too, for directories left by older releases.
+        roots = {self.root, Path(tempfile.gettempdir())}
+        for root in roots:
+            for entry in self._directories(root):
+                try:
+                    newest = entry.stat().st_mtime
+                    for dirpath, _, filenames in os.walk(entry.path):
+                        for filename in filenames:
+                            newest = max(newest, os.stat(os.path.join(dirpath, filename)).st_mtime)
+                except OSError:
+                    continue
+                if newest < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed += 1
+        with self._lock:
+            self.swept += removed
+            self.last_sweep_at = time.time()
+        if removed:
+            logger.info("Scratch janitor removed %s stale directories", removed)
+        return removed
+
+    def _janitor_loop(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Scratch janitor failed")
+            time.sleep(SCRATCH_SWEEP_INTERVAL)
+
+    def ensure_janitor(self):
+        with self._lock:
+            if self._janitor_started:
+                return
+            self._janitor_started = True
+        thread = threading.Thread(target=self._janitor_loop, name="scratch-janitor", daemon=True)
+        thread.start()
+
+
+scratch_space = ScratchSpace(SCRATCH_QUOTA_BYTES)
+
+
+def media_cache_key(url: str, *settings) -> str:
+    # Keyed on host and path only, so a re-signed or expired CDN URL maps to the same media.
+    parsed = urlparse(url)
+    parts = [f"{parsed.hostname}{parsed.path}", *(str(setting) for setting in settings)]
+    return hashlib.sha256(":".join(parts).encode()).hexdigest()
+
+
+def thumbnail_cache_path(url: str, width: int) -> Path:
+    return THUMBNAIL_CACHE_DIR / f"{media_cache_key(url, width)}.jpg"
+
+
+def evict_thumbnail_cache():
+    entries = []
+    total = 0
+    for path in THUMBNAIL_CACHE_DIR.glob("*.jpg"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        # atime is bumped explicitly on every hit (see send_cached_thumbnail), so it tracks recency.
+        entries.append((stat.st_atime, stat.st_size, path))
+        total += stat.st_size
+    for _, size, path in sorted(entries):
+        if total <= THUMBNAIL_CACHE_MAX_BYTES:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+@traced("render_thumbnail")
+def render_thumbnail(url: str, dest_path: Path, width: int, deadline: Deadline):
+    session = get_requests_session(url)
+    with session.get(url, stream=True, timeout=deadline.timeout(15, "thumbnail")) as response:
+        response.raise_for_status()
+        data = response.raw.read(THUMBNAIL_SOURCE_MAX_BYTES + 1, decode_content=True)
+    if len(data) > THUMBNAIL_SOURCE_MAX_BYTES:
+        raise ValueError("Thumbnail source is too large")
+
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = dest_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
     command = [
-        ffmpeg_path,
+        get_ffmpeg_path(),
         "-hide_banner",
         "-loglevel",
         "error",
         "-y",
         "-i",
-        str(input_path),
-        "-vn",
-        "-acodec",
-        "libmp3lame",
-        "-b:a",
-        "192k",
-        str(output_path),
+        "pipe:0",
+        "-vf",
+        f"scale='min({width},iw)':-2",
+        "-frames:v",
+        "1",
+        "-q:v",
+        "4",
+        "-f",
+        "mjpeg",
+        str(partial_path),
     ]
-    result = subprocess.run(command, capture_output=True, text=True)
+    deadline.check("thumbnail resize")
+    try:
+        result = subprocess.run(command, input=data, capture_output=True, timeout=deadline.remaining())
+    except subprocess.TimeoutExpired as exc:
+        partial_path.unlink(missing_ok=True)
+        raise DeadlineExceeded("Thumbnail resize did not finish within the request deadline") from exc
     if result.returncode != 0:
-        raise RuntimeError(result.stderr or "ffmpeg failed")
+        partial_path.unlink(missing_ok=True)
+        raise RuntimeError(result.stderr.decode(errors="replace") or "ffmpeg failed")
+    os.replace(partial_path, dest_path)
+    evict_thumbnail_cache()
+
+
+def parse_timestamp(value: str) -> float:
+    parts = value.strip().split(":")
+    if len(parts) > 3:
+        raise ValueError
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def parse_clip_window(args) -> tuple[float, float] | None:
+    raw_start = args.get("start", "").strip()
+    raw_end = args.get("end", "").strip()
+    raw_duration = args.get("duration", "").strip()
+    if not (raw_start or raw_end or raw_duration):
+        return None
+    try:
+        start = parse_timestamp(raw_start) if raw_start else 0.0
+        if raw_end:
+            duration = parse_timestamp(raw_end) - start
+        elif raw_duration:
+            duration = parse_timestamp(raw_duration)
+        else:
+            duration = MAX_CLIP_SECONDS
+    except ValueError:
+        raise ValueError("Invalid start, end or duration") from None
+    if not (math.isfinite(start) and math.isfinite(duration) and start >= 0 and 0 < duration <= MAX_CLIP_SECONDS):
+        raise ValueError("Invalid start, end or duration")
+    return start, duration
+
+
+_static_assets = {}
+_static_assets_lock = threading.Lock()
+
+
+def load_static_asset(filename: str) -> dict | None:
+    """Return a compressible public file with its gzip/brotli variants, built once per mtime."""
+    path = safe_join(str(PUBLIC_DIR), filename)
+    if not path or not os.path.isfile(path):
+        return None
+    mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if not mimetype.startswith(STATIC_COMPRESSIBLE_TYPES):
+        return None
+
+    mtime = os.stat(path).st_mtime_ns
+    asset = _static_assets.get(filename)
+    if asset and asset["mtime"] == mtime:
+        return asset
+
+    body = Path(path).read_bytes()
+    if filename == "index.html":
+        body = body.replace(b"__APP_VERSION__", quote(APP_VERSION).encode())
+    asset = {
+        "mtime": mtime,
+        "mimetype": mimetype,
+        "etag": hashlib.sha256(body).hexdigest()[:32],
+        "identity": body,
+        "gzip": gzip.compress(body, compresslevel=9, mtime=0),
+        "br": brotli.compress(body, quality=11) if brotli else None,
+    }
+    with _static_assets_lock:
+        _static_assets[filename] = asset
+    return asset
+
+
+def send_static_asset(filename: str):
+    asset = load_static_asset(filename)
+    fingerprinted = request.args.get("v") == APP_VERSION
+    if asset is None:
+        return send_from_directory(PUBLIC_DIR, filename, max_age=STATIC_MAX_AGE if fingerprinted else 0)
+
+    encoding = "identity"
+    if asset["br"] is not None and "br" in request.accept_encodings:
+        encoding = "br"
+    elif "gzip" in request.accept_encodings:
+        encoding = "gzip"
+
+    response = Response(asset[encoding], mimetype=asset["mimetype"])
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.set_etag(f"{asset['etag']}-{encoding}")
+    if fingerprinted:
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 
 @app.get("/")
 def serve_index():
-    return send_from_directory(PUBLIC_DIR, "index.html")
+    return send_static_asset("index.html")
+
+
+@app.get("/<path:filename>")
+def serve_static(filename: str):
+    return send_static_asset(filename)
 
 
 @app.get("/api/session")
 def api_session():
-    ok, info = check_instagram_session()
-    return jsonify({"ok": ok, **info}), 200
+    force = request.args.get("refresh", "").lower() in {"1", "true", "yes"}
+    status = get_session_status(force=force)
+    checked_at = status["checkedAt"]
+    return (
+        jsonify(
+            {
+                "ok": status["ok"],
+                **status["info"],
+                "checkedAt": int(checked_at) if checked_at else None,
+                "ageSeconds": round(time.time() - checked_at, 1) if checked_at else None,
+                "refreshInterval": SESSION_CHECK_INTERVAL,
+            }
+        ),
+        200,
+    )
+
+
+def cacheable_json(payload: dict):
+    response = jsonify(payload)
+    response.cache_control.public = True
+    response.cache_control.max_age = REEL_MAX_AGE
+    response.cache_control.stale_while_revalidate = REEL_STALE_WHILE_REVALIDATE
+    response.add_etag()
+    return response.make_conditional(request)
 
 
 @app.get("/api/reel")
@@ -730,87 +1901,58 @@ def api_reel():
             400,
         )
 
+    deadline = request_deadline("api_reel")
     try:
         if is_direct_mp4_url(url):
-            video_url = url
             file_part = Path(urlparse(url).path).name.replace(".mp4", "")
-            title = file_part or "Instagram Reel"
-            audio_name = file_part or "Original audio"
-            thumbnail_url = ""
+            info = MediaInfo(
+                title=file_part or "Instagram Reel",
+                audio_name=file_part or "Original audio",
+                video_variants=[MediaVariant(url=url)],
+                expires_at=url_expiry(url),
+            )
         else:
             shortcode = extract_shortcode(url)
             if not shortcode and is_audio:
                 audio_id = extract_audio_id(url)
                 logger.info("Audio link detected id=%s", audio_id or "none")
-                resolved = resolve_audio_link(url)
-                if resolved.get("videoUrl"):
-                    video_url = resolved.get("videoUrl", "")
-                    title = resolved.get("title", "Instagram Reel")
-                    audio_name = resolved.get("audioName", "Original audio")
-                    thumbnail_url = resolved.get("thumbnailUrl", "")
-                    download_name = sanitize_filename(audio_name or title)
-                    return jsonify(
-                        {
-                            "title": title,
-                            "audioName": audio_name,
-                            "thumbnailUrl": thumbnail_url,
-                            "previewUrl": f"/api/reel/preview?url={quote(video_url)}",
-                            "mp3Url": f"/api/reel/audio?url={quote(video_url)}&name={quote(download_name)}",
-                            "downloadName": f"{download_name}.mp3",
-                        }
-                    )
-                shortcode = resolved.get("shortcode", "")
+                resolved, shortcode = resolve_audio_link(url, deadline)
+                if resolved:
+                    return cacheable_json(resolved.to_api())
                 if not shortcode:
                     return jsonify({"error": "Could not find a reel for this audio link."}), 400
             if not shortcode:
                 return jsonify({"error": "Could not read reel shortcode."}), 400
 
-            post = None
-            try:
-                post = fetch_instagram_post(shortcode)
-            except instaloader.exceptions.InstaloaderException as exc:
-                logger.warning("Instaloader failed: %s", exc)
-
-            if post and not post.is_video:
-                return jsonify({"error": "This Reel has no video."}), 400
-
-            if post and post.video_url:
-                video_url = post.video_url
-                title = post.caption or f"Reel by @{post.owner_username}"
-                audio_name = extract_audio_name(post) or "Original audio"
-                thumbnail_url = post.url
-            else:
-                fallback = fetch_reel_json(shortcode)
-                parsed = parse_reel_json(fallback or {})
-                video_url = parsed.get("videoUrl", "")
-                title = parsed.get("title", "Instagram Reel")
-                audio_name = parsed.get("audioName", "Original audio")
-                thumbnail_url = parsed.get("thumbnailUrl", "")
-
-            if not video_url:
-                private_data = fetch_private_api(shortcode)
-                parsed_private = parse_private_api(private_data or {})
-                video_url = parsed_private.get("videoUrl", "")
-                if video_url:
-                    title = parsed_private.get("title", title)
-                    audio_name = parsed_private.get("audioName", audio_name)
-                    thumbnail_url = parsed_private.get("thumbnailUrl", thumbnail_url)
-                else:
+            info = None
+            if INSTALOADER_ENABLED:
+                try:
+                    is_video, info = fetch_instagram_post(shortcode, deadline)
+                    if not is_video:
+                        return jsonify({"error": "This Reel has no video."}), 400
+                except (get_instaloader().exceptions.InstaloaderException, InstaloaderUnavailable) as exc:
+                    logger.warning("Instaloader failed: %s", exc)
+
+            if info is None:
+                info = extract_media_info(fetch_reel_json(shortcode, deadline) or {})
+
+            if not info.video_url:
+                private_info = extract_media_info(fetch_private_api(shortcode, deadline) or {})
+                if not private_info.video_url:
                     return jsonify({"error": "Could not locate a playable reel video."}), 502
+                info = private_info
 
-        download_name = sanitize_filename(audio_name or title)
-
-        return jsonify(
-            {
-                "title": title or "Instagram Reel",
-                "audioName": audio_name or "Original audio",
-                "thumbnailUrl": thumbnail_url or "",
-                "previewUrl": f"/api/reel/preview?url={quote(video_url)}",
-                "mp3Url": f"/api/reel/audio?url={quote(video_url)}&name={quote(download_name)}",
-                "downloadName": f"{download_name}.mp3",
-            }
-        )
+        return cacheable_json(info.to_api())
     except Exception as exc:
+        if isinstance(exc, DeadlineExceeded) or (isinstance(exc, requests.Timeout) and deadline.expired()):
+            logger.warning("Reel lookup timed out after %.1fs: %s", deadline.seconds, exc)
+            payload = {
+                "error": "Instagram took too long to respond. Please try again.",
+                "reason": "deadline_exceeded",
+            }
+            if DEBUG_ERRORS:
+                payload["details"] = str(exc)
+            return jsonify(payload), 504
         logger.exception("Failed to fetch reel details")
         payload = {"error": "Failed to fetch reel details."}
         if DEBUG_ERRORS:
@@ -824,9 +1966,10 @@ def api_preview():
     if not url or not is_allowed_media_host(url):
         return "Invalid media URL", 400
 
+    deadline = request_deadline("api_preview")
     try:
         session = get_requests_session(url)
-        upstream = session.get(url, stream=True, timeout=30)
+        upstream = session.get(url, stream=True, timeout=deadline.timeout(30, "preview"))
         upstream.raise_for_status()
 
         def generate():
@@ -840,6 +1983,54 @@ def api_preview():
         return "Preview failed", 500
 
 
+@app.get("/api/reel/thumbnail")
+def api_thumbnail():
+    url = request.args.get("url", "").strip()
+    if not url or not is_allowed_media_host(url):
+        return "Invalid media URL", 400
+    try:
+        width = int(request.args.get("w", THUMBNAIL_DEFAULT_WIDTH))
+    except ValueError:
+        width = THUMBNAIL_DEFAULT_WIDTH
+    width = min(THUMBNAIL_WIDTHS, key=lambda candidate: abs(candidate - width))
+
+    path = thumbnail_cache_path(url, width)
+    try:
+        return send_cached_thumbnail(path)
+    except FileNotFoundError:
+        pass
+
+    deadline = request_deadline("api_thumbnail")
+    try:
+        render_thumbnail(url, path, width, deadline)
+        return send_cached_thumbnail(path)
+    except DeadlineExceeded:
+        return "Thumbnail timed out", 504
+    except Exception:
+        logger.exception("Thumbnail rendering failed")
+        return "Thumbnail failed", 502
+
+
+def send_cached_thumbnail(path: Path):
+    # Eviction in another thread or worker can remove the file at any point before send_file
+    # opens it; callers treat FileNotFoundError as a cache miss.
+    stat = path.stat()
+    # Only atime is touched for LRU recency; mtime stays the render time so Last-Modified is stable.
+    os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+    with trace_stage("send_file"):
+        # The filename is the cache key, so it doubles as a validator that never changes.
+        response = send_file(
+            path,
+            mimetype="image/jpeg",
+            max_age=THUMBNAIL_MAX_AGE,
+            etag=path.stem,
+            last_modified=stat.st_mtime,
+        )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
 @app.get("/api/reel/audio")
 def api_audio():
     url = request.args.get("url", "").strip()
@@ -848,29 +2039,229 @@ def api_audio():
     if not url or not is_allowed_media_host(url):
         return "Invalid media URL", 400
 
+    try:
+        clip = parse_clip_window(request.args)
+    except ValueError as exc:
+        return str(exc), 400
+
+    start, duration = clip if clip else (None, None)
+    etag = media_cache_key(url, start, duration, MP3_CODEC, MP3_BITRATE)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = MP3_MAX_AGE
+        return response
+
     safe_name = sanitize_filename(name)
-    tmp_dir = Path(tempfile.mkdtemp(prefix="reeltomp3_"))
+    deadline = request_deadline("api_audio")
+    try:
+        tmp_dir = scratch_space.allocate(SCRATCH_RESERVE_BYTES, deadline)
+    except ScratchQuotaExceeded as exc:
+        logger.warning("Rejecting audio conversion: %s", exc)
+        return "Server is busy, please try again shortly", 503, {"Retry-After": "5"}
     video_path = tmp_dir / "input.mp4"
     mp3_path = tmp_dir / "output.mp3"
 
     @after_this_request
     def cleanup(response):
-        shutil.rmtree(tmp_dir, ignore_errors=True)
+        scratch_space.release(tmp_dir)
         return response
 
     try:
-        download_file(url, video_path)
-        run_ffmpeg(video_path, mp3_path)
-        return send_file(
-            mp3_path,
-            mimetype="audio/mpeg",
-            as_attachment=True,
-            download_name=f"{safe_name}.mp3",
-        )
+        windowed = False
+        if clip:
+            try:
+                windowed = download_mp4_window(url, video_path, start, start + duration, deadline)
+            except DeadlineExceeded:
+                raise
+            except Exception as exc:
+                logger.info("Clip window fetch unavailable, downloading full file: %s", exc)
+        if not windowed:
+            download_file(url, video_path, deadline)
+        run_ffmpeg(video_path, mp3_path, deadline, start=start, duration=duration)
+        with trace_stage("send_file"):
+            response = send_file(
+                mp3_path,
+                mimetype="audio/mpeg",
+                as_attachment=True,
+                download_name=f"{safe_name}.mp3",
+                etag=etag,
+                max_age=MP3_MAX_AGE,
+            )
+        response.cache_control.public = True
+        return response
+    except DeadlineExceeded:
+        logger.warning("Audio conversion exceeded %.1fs deadline", deadline.seconds)
+        return "Audio conversion timed out", 504
     except Exception:
+        if deadline.expired():
+            return "Audio conversion timed out", 504
         return "Audio conversion failed", 500
 
 
+_profile_lock = threading.Lock()
+_profile_capture = {"active": False, "rate": 0.0, "stats": None}
+_profile_thread = None
+
+
+def start_trace():
+    trace_id = re.sub(r"[^A-Za-z0-9_-]", "", request.headers.get("X-Request-ID", ""))[:64]
+    g.trace = {"id": trace_id or uuid.uuid4().hex[:16], "started": time.perf_counter(), "stages": []}
+    if _profile_capture["active"] and random.random() < _profile_capture["rate"]:
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+def finish_trace(response):
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        with _profile_lock:
+            if _profile_capture["stats"] is None:
+                _profile_capture["stats"] = pstats.Stats(profiler)
+            else:
+                _profile_capture["stats"].add(profiler)
+
+    trace = g.get("trace")
+    if trace is None:
+        return response
+    response.headers["X-Trace-Id"] = trace["id"]
+    total = time.perf_counter() - trace["started"]
+    if total >= SLOW_REQUEST_SECONDS:
+        slow_logger.warning(
+            json.dumps(
+                {
+                    "traceId": trace["id"],
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "totalMs": round(total * 1000, 2),
+                    "stages": trace["stages"],
+                }
+            )
+        )
+    return response
+
+
+if TRACING_ENABLED:
+    app.before_request(start_trace)
+    app.after_request(finish_trace)
+
+
+PROFILE_DIR = Path(tempfile.gettempdir()) / "reeltomp3-profiles"
+
+
+def sample_stacks(seconds: float, interval: float = 0.01) -> str:
+    """Collapsed stack samples of every other thread in this worker, flamegraph-ready."""
+    counts = Counter()
+    own_thread = threading.get_ident()
+    ends_at = time.monotonic() + seconds
+    while time.monotonic() < ends_at:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return "\n".join(f"{stack} {count}" for stack, count in counts.most_common())
+
+
+def capture_cprofile(seconds: float, rate: float) -> str:
+    with _profile_lock:
+        _profile_capture.update({"active": True, "rate": rate, "stats": None})
+    try:
+        time.sleep(seconds)
+    finally:
+        with _profile_lock:
+            _profile_capture["active"] = False
+            stats = _profile_capture["stats"]
+            _profile_capture["stats"] = None
+    if stats is None:
+        return "No requests were sampled during the capture window.\n"
+    output = io.StringIO()
+    stats.stream = output
+    stats.sort_stats("cumulative").print_stats(60)
+    return output.getvalue()
+
+
+def _run_profile(mode: str, seconds: float, rate: float):
+    try:
+        body = sample_stacks(seconds) if mode == "stack" else capture_cprofile(seconds, rate)
+    except Exception as exc:
+        body = f"Profile capture failed: {exc}\n"
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    # Written to a shared directory so the result can be collected through any worker.
+    path = PROFILE_DIR / f"{int(time.time())}-{os.getpid()}-{mode}.txt"
+    path.write_text(body)
+
+
+def start_profile(mode: str, seconds: float, rate: float) -> bool:
+    """Capture in a background thread, so the sync worker keeps serving requests meanwhile."""
+    global _profile_thread
+    with _profile_lock:
+        if _profile_thread is not None and _profile_thread.is_alive():
+            return False
+        _profile_thread = threading.Thread(
+            target=_run_profile, args=(mode, seconds, rate), name="profile-capture", daemon=True
+        )
+        _profile_thread.start()
+    return True
+
+
+def has_admin_token() -> bool:
+    token = request.headers.get("X-Admin-Token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def is_admin_request() -> bool:
+    return TRACING_ENABLED and has_admin_token()
+
+
+@app.post("/api/admin/profile")
+def api_admin_profile_start():
+    if not is_admin_request():
+        return jsonify({"error": "Not found"}), 404
+    try:
+        seconds = min(max(float(request.args.get("seconds", "5")), 0.1), PROFILE_MAX_SECONDS)
+        rate = min(max(float(request.args.get("rate", "1")), 0.0), 1.0)
+    except ValueError:
+        return jsonify({"error": "Invalid seconds or rate"}), 400
+    mode = request.args.get("mode", "stack")
+    if mode not in {"stack", "cprofile"}:
+        return jsonify({"error": "Mode must be stack or cprofile"}), 400
+    if not start_profile(mode, seconds, rate):
+        return jsonify({"error": "A profile capture is already running in this worker"}), 409
+    payload = {"mode": mode, "seconds": seconds, "pid": os.getpid(), "readyAt": int(time.time() + seconds)}
+    return jsonify(payload), 202
+
+
+@app.get("/api/admin/profile")
+def api_admin_profile():
+    if not is_admin_request():
+        return jsonify({"error": "Not found"}), 404
+    captures = sorted(PROFILE_DIR.glob("*.txt")) if PROFILE_DIR.is_dir() else []
+    if not captures:
+        return jsonify({"error": "No finished profile capture"}), 404
+    latest = captures[-1]
+    response = Response(latest.read_text(), mimetype="text/plain")
+    response.headers["X-Profile-Pid"] = latest.stem.split("-")[1]
+    response.cache_control.no_store = True
+    return response
+
+
+@app.get("/api/scratch")
+def api_scratch():
+    # Usage exposes the scratch path and load counters, so it is for operators only.
+    if not has_admin_token():
+        return jsonify({"error": "Not found"}), 404
+    return jsonify(scratch_space.usage())
+
+
 @app.get("/api/health")
 def api_health():
     return jsonify({"status": "ok", "version": APP_VERSION})
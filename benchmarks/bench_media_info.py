@@ -0,0 +1,42 @@
+"""Benchmark MediaInfo extraction across recorded payload shapes.
+
+Usage: python benchmarks/bench_media_info.py [iterations]
+"""
+
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import extract_media_info, find_media_item_in_json  # noqa: E402
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+
+def load_fixtures() -> dict:
+    return {path.stem: json.loads(path.read_text()) for path in sorted(FIXTURES_DIR.glob("*.json"))}
+
+
+def extract(payload: dict):
+    # Audio pages nest reels several levels deep, the same way resolve_audio_link sees them.
+    if "graphql" in payload or payload.get("items"):
+        return extract_media_info(payload)
+    return extract_media_info(find_media_item_in_json(payload) or {})
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for name, payload in load_fixtures().items():
+        info = extract(payload)
+        seconds = timeit.timeit(lambda: extract(payload), number=iterations)
+        print(
+            f"{name:<22} {seconds / iterations * 1e6:8.2f} us/op  "
+            f"video={len(info.video_variants)} audio={len(info.audio_variants)} "
+            f"asset={info.audio_asset_id or '-'} name={info.audio_name!r}"
+        )
+
+
+if __name__ == "__main__":
+    main()